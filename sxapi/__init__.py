@@ -17,15 +17,26 @@ warnings.warn(
 
 class API(object):
     def __init__(
-        self, email=None, password=None, api_key=None, endpoint=None, tz_aware=True
+        self,
+        email=None,
+        password=None,
+        api_key=None,
+        endpoint=None,
+        tz_aware=True,
+        **kwargs,
     ):
-        """Initialize a new API client instance."""
+        """Initialize a new API client instance.
+
+        Further keyword arguments (asynchronous, http2, retries, ...) are
+        passed on to the low level client, see sxapi.low.BaseAPI.
+        """
         self.low = LowLevelPublicAPI(
             email=email,
             password=password,
             api_key=api_key,
             endpoint=endpoint,
             tz_aware=tz_aware,
+            **kwargs,
         )
         warnings.warn(
             "deprecated: this package will break all APIs with version 1.x",
@@ -72,18 +83,27 @@ class LowLevelAPI(object):
         api_key=None,
         public_endpoint=None,
         tz_aware=True,
+        **kwargs,
     ):
-        """Initialize a new API client instance."""
+        """Initialize a new API client instance.
+
+        Further keyword arguments (asynchronous, http2, retries, ...) are
+        passed on to the low level clients, see sxapi.low.BaseAPI.
+        """
         self.publiclow = LowLevelPublicAPI(
             email=email,
             password=password,
             api_key=api_key,
             endpoint=public_endpoint,
             tz_aware=tz_aware,
+            **kwargs,
         )
         if private_endpoint is not None and api_key is not None:
             self.privatelow = LowLevelInternAPI(
-                endpoint=private_endpoint, api_key=api_key, tz_aware=tz_aware
+                endpoint=private_endpoint,
+                api_key=api_key,
+                tz_aware=tz_aware,
+                **kwargs,
             )
         else:
             pass
@@ -126,6 +146,9 @@ class LowLevelAPI(object):
     def get_device_uploads(self, from_ts, to_ts, device_id):
         return self.publiclow.get_device_uploads(from_ts, to_ts, device_id)
 
+    def get_device_uploads_iter(self, from_ts, to_ts, device_id, days=1):
+        return self.privatelow.get_device_uploads_iter(from_ts, to_ts, device_id, days)
+
     def get_organisation_by_id(self, organisation_id):
         return self.publiclow.get_organisation_by_id(organisation_id)
 
@@ -288,6 +311,9 @@ class LowLevelAPI(object):
     def getUploads(self, device_id, from_date, to_date):
         return self.privatelow.getUploads(device_id, from_date, to_date)
 
+    def getUploadsMany(self, device_ids, from_date, to_date):
+        return self.privatelow.getUploadsMany(device_ids, from_date, to_date)
+
     def lastProductionDevices(self, device_id=None, skip=0, limit=10):
         return self.privatelow.lastProductionDevices(device_id, skip, limit)
 
@@ -360,6 +386,9 @@ class LowLevelAPI(object):
     def query_users(self, email_search_string=None):
         return self.privatelow.query_users(email_search_string=email_search_string)
 
+    def query_users_iter(self, email_search_string=None):
+        return self.privatelow.query_users_iter(email_search_string=email_search_string)
+
     def get_hidden_shares(self, user_id):
         return self.privatelow.get_hidden_shares(user_id)
 
@@ -391,6 +420,11 @@ class LowLevelAPI(object):
             group_id, metrics, from_date, to_date
         )
 
+    def getGroupSensorDataBulkIter(self, group_id, metrics, from_date, to_date):
+        return self.privatelow.getGroupSensorDataBulkIter(
+            group_id, metrics, from_date, to_date
+        )
+
     def insertGroupSensorDataBulk(self, sensordata):
         return self.privatelow.insertGroupSensorDataBulk(sensordata)
 
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# coding: utf8
+
+
+import asyncio
+import time
+
+from collections import deque
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .low import _ClientMixin, orjson, _as_list, _make_response, _next_offset, _query_items
+from .models import HDict, QueryParams
+from .helper import checkSensorData
+
+
+class AsyncBaseAPI(_ClientMixin):
+    """asyncio variant of BaseAPI on top of one aiohttp.ClientSession.
+
+    For callers that already run an event loop. URL building, request
+    tracking and status handling are shared with BaseAPI (see _ClientMixin).
+    """
+
+    def __init__(self, base_url, email=None, password=None, api_key=None,
+                 limit=100, limit_per_host=20, track_requests=True):
+        """Initialize a new asyncio base low level API client instance.
+        """
+        if aiohttp is None:
+            raise ValueError("aiohttp is needed for the async API")
+        self.api_base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.api_key = api_key
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+
+        self._session_key = None
+        self._session_expiration = time.time() - 1
+        self._session = None
+        self._login_lock = None
+        self.counter = 0
+        self.requests = deque(maxlen=100)
+        self._track = track_requests
+
+    async def session(self):
+        """Create the aiohttp session on first use and login.
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._login_lock = asyncio.Lock()
+        if time.time() > self._session_expiration:
+            # concurrent first requests share one login
+            async with self._login_lock:
+                if time.time() > self._session_expiration:
+                    await self._login()
+        return self._session
+
+    async def _login(self):
+        """Login to the api with api key or the given credentials.
+        """
+        if self.api_key:
+            self._session_key = self.api_key
+            self._session_expiration = time.time() + 365 * 24 * 60 * 60
+        else:
+            if self.email is None or self.password is None:
+                raise ValueError("email and password are needed for API access")
+            params = {"email": self.email, "password": self.password}
+            async with self._session.get(self.to_url("/user/get_token"), params=params) as res:
+                if res.status in (401, 409, 422):
+                    raise ValueError("invalid login credentials")
+                r = _make_response(res.status, res.reason, str(res.url), res.headers, await res.read())
+            r.raise_for_status()
+            self._session_key = r.json()["token"]
+            self._session_expiration = time.time() + 23 * 60 * 60
+        self._session.headers.update(
+            {"Authorization": "Bearer {}".format(self._session_key)})
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._session_expiration = time.time() - 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _request(self, method, path, version=None, params=None, data=None, json=None,
+                       headers=None, timeout=None):
+        url = self.to_url(path, version)
+        kwargs = {"params": _query_items(params), "data": data, "json": json, "headers": headers,
+                  "allow_redirects": method == "GET"}
+        if orjson is not None and json is not None:
+            self._encode_json(kwargs)
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        session = await self.session()
+        start = time.monotonic()
+        async with session.request(method, url, **kwargs) as resp:
+            r = _make_response(resp.status, resp.reason, str(resp.url), resp.headers,
+                               await resp.read())
+        return self._handle_response(r, method, url, start)
+
+    async def _paginate_iter(self, path, params, version=None):
+        while True:
+            res = await self.get(path, params=params, version=version)
+            for item in res["data"]:
+                yield item
+            next_offset = _next_offset(res, params["limit"])
+            if next_offset is None:
+                return
+            params["offset"] = next_offset
+
+    async def get(self, path, params=None, **kwargs):
+        return await self._request("GET", path, params=params, **kwargs)
+
+    async def post(self, path, data=None, json=None, **kwargs):
+        return await self._request("POST", path, data=data, json=json, **kwargs)
+
+    async def put(self, path, data=None, json=None, **kwargs):
+        return await self._request("PUT", path, data=data, json=json, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self._request("DELETE", path, **kwargs)
+
+
+class AsyncLowLevelInternAPI(AsyncBaseAPI):
+    def __init__(self, endpoint, api_key=None, **kwargs):
+        """Initialize a new asyncio low level intern API client instance.
+        """
+        if not endpoint:
+            raise ValueError("Endpoint needed for low level API")
+        super().__init__(endpoint, api_key=api_key, **kwargs)
+
+    async def getUploads(self, device_id, from_date, to_date):
+        p = HDict({"device_id": device_id, "from_date": int(
+            from_date), "to_date": int(to_date)})
+        return await self.get("/anthilluploadbulk", params=p)
+
+    async def lastProductionDevices(self, device_id=None, skip=0, limit=10):
+        p = HDict({"skip": int(skip), "limit": int(limit)})
+        if device_id:
+            p["device_id"] = device_id
+        return await self.get("/productionevents", params=p)
+
+    async def query_users(self, email_search_string=None):
+        return [u async for u in self.query_users_iter(email_search_string)]
+
+    def query_users_iter(self, email_search_string=None):
+        params = QueryParams({"email_search_string": email_search_string, "limit": 100,
+                              "offset": 0})
+        return self._paginate_iter("/user/list", params, version="v1")
+
+    async def get_hidden_shares(self, user_id):
+        params = HDict({"user_id": user_id})
+        return await self.get("/user/hidden_shares_by_user", params=params, version="v1")
+
+    async def delete_hidden_share(self, share_id):
+        params = HDict({"share_id": share_id})
+        return await self.delete("/user/hidden_share", params=params, version="v1")
+
+    async def create_hidden_share(self, organisation_id, user_id):
+        params = HDict({"organisation_id": organisation_id,
+                        "user_id": user_id})
+        return await self.put("/user/hidden_share", json=params, version="v1")
+
+    async def activate_user(self, email):
+        p = HDict({"user_email": email})
+        return await self.put("/user/activate", json=p, version="v1")
+
+    async def search_devices(self, search_string):
+        p = HDict({"search_string": search_string})
+        return await self.get("/devicesearch", params=p)
+
+    async def get_device_uploads(self, from_ts, to_ts, device_id):
+        params = HDict({
+            "device_id": device_id,
+            "from_date": from_ts,
+            "to_date": to_ts
+        })
+        return await self.get("/anthilluploadbulk", params=params)
+
+    async def get_animals_by_organisation(self, organisation_id):
+        p = HDict({"organisation_id": organisation_id})
+        return await self.get("/animallist", params=p)
+
+    async def move_device(self, device_id, organisation_id):
+        p = HDict({"organisation_id": organisation_id, "device_id": device_id})
+        return await self.post("/organisation/move_device", json=p, version="v1")
+
+    async def deactivate_device(self, device_id, activation_code):
+        p = HDict({"device_id": device_id, "activation_code": activation_code})
+        return await self.post("/organisation/deactivate_device", json=p, version="v1")
+
+    async def move_animal(self, animal_id, organisation_id):
+        p = HDict({"animal_id": animal_id, "organisation_id": organisation_id})
+        return await self.post("/organisation/move_animal", json=p, version="v1")
+
+    async def set_device_defect(self, device_id, defect_date, defect_info):
+        p = HDict({"defect_date": defect_date.isoformat(),
+                   "defect_info": defect_info})
+        return await self.put("/devices/{}/defect".format(device_id),
+                              json=p, version="v1")
+
+    async def getGroupSensorDataBulk(self, group_id, metrics, from_date, to_date):
+        params = HDict({"group_id": group_id, "metrics": _as_list(metrics),
+                        "from_date": from_date, "to_date": to_date})
+        return await self.get("/groupsensordatabulk", params=params, timeout=15)
+
+    async def insertGroupSensorDataBulk(self, sensordata):
+        data = HDict({"sensordata": _as_list(sensordata)})
+        checkSensorData(data["sensordata"])
+        return await self.put("/groupsensordatabulk", json=data, timeout=25)
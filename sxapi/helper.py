@@ -1,12 +1,19 @@
 #!/usr/bin/python
 # coding: utf8
 
+import copy
 import datetime
-import collections
+import math
 import time
 import functools
+import weakref
 import pendulum
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def toTS(dt):
     if isinstance(dt, pendulum.DateTime):
@@ -74,27 +81,94 @@ def splitTimeRange(start, end, days):
         yield (last + 1, t)
 
 
+def _isNumber(x):
+    return isinstance(x, (int, float)) and math.isfinite(x)
+
+
+def findInvalidPoint(data):
+    """Return (point, field) for the first point with a non numeric or non
+    finite timestamp ("TS") or value ("VALUE"), or None if all points are
+    valid. NaN and Infinity are invalid, JSON has no way to send them.
+
+    With numpy available the whole series is checked in one array
+    conversion; the per point loop only runs to locate an invalid point
+    (or for series numpy can not classify, e.g. bools or ragged points).
+    """
+    if np is not None and len(data):
+        try:
+            arr = np.asarray(data)
+        except ValueError:
+            arr = None
+        if arr is not None and arr.ndim == 2 and arr.shape[1] >= 2 and arr.dtype.kind in "iuf":
+            if arr.dtype.kind != "f" or np.isfinite(arr[:, :2]).all():
+                return None
+    for point in data:
+        if not _isNumber(point[0]):
+            return point, "TS"
+        if not _isNumber(point[1]):
+            return point, "VALUE"
+    return None
+
+
+def checkSensorData(sensordata):
+    """Raise a ValueError for the first series with an invalid point (see
+    findInvalidPoint), before any of the sensordata is sent.
+    """
+    for s in sensordata:
+        invalid = findInvalidPoint(s["data"])
+        if invalid is not None:
+            point, field = invalid
+            raise ValueError("Invalid {} Point: {} of metric {}".format(
+                field, point, s["metric"]))
+
+
 class Memoize(object):
     '''Decorator. Caches a function's return value each time it is called.
     If called later with the same arguments, the cached value is returned
-    (not reevaluated).
+    (not reevaluated). With a ttl (see Memoize.expiring) cached values are
+    reevaluated once they are older than ttl seconds.
+
+    For instance methods every instance gets its own cache, which goes away
+    with the instance. Use cache_clear() to invalidate cached values, e.g.
+    after a call that modifies the cached objects. Every call gets its own
+    copy of a cached value, so changing it leaves the cache intact.
     '''
 
-    def __init__(self, func):
+    def __init__(self, func, ttl=None):
         self.func = func
+        self.ttl = ttl
         self.cache = {}
+        self.instance_caches = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def expiring(cls, ttl):
+        '''Return a Memoize decorator whose values expire after ttl seconds.'''
+        return functools.partial(cls, ttl=ttl)
 
     def __call__(self, *args):
-        if not isinstance(args, collections.Hashable):
+        return self._lookup(self.cache, self.func, *args)
+
+    def _lookup(self, cache, func, *args):
+        try:
+            entry = cache.get(args)
+        except TypeError:
             # uncacheable. a list, for instance.
             # better to not cache than blow up.
-            return self.func(*args)
-        if args in self.cache:
-            return self.cache[args]
+            return func(*args)
+        now = time.monotonic()
+        if entry is not None and (entry[1] is None or now < entry[1]):
+            return copy.deepcopy(entry[0])
+        value = func(*args)
+        cache[args] = (copy.deepcopy(value), None if self.ttl is None else now + self.ttl)
+        return value
+
+    def cache_clear(self, obj=None):
+        '''Drop all cached values or only the ones of instance obj.'''
+        if obj is None:
+            self.cache.clear()
+            self.instance_caches.clear()
         else:
-            value = self.func(*args)
-            self.cache[args] = value
-            return value
+            self.instance_caches.pop(obj, None)
 
     def __repr__(self):
         '''Return the function's docstring.'''
@@ -102,4 +176,7 @@ class Memoize(object):
 
     def __get__(self, obj, objtype):
         '''Support instance methods.'''
-        return functools.partial(self.__call__, obj)
+        if obj is None:
+            return self
+        cache = self.instance_caches.setdefault(obj, {})
+        return functools.partial(self._lookup, cache, functools.partial(self.func, obj))
@@ -2,28 +2,242 @@
 # coding: utf8
 
 
+import atexit
+import copy
+import functools
 import time
 import logging
 import requests
 import re
+import threading
 import pendulum
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import asyncio
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from .models import HDict, QueryParams
+from .helper import splitTimeRange, checkSensorData, Memoize
 
-from .models import HDict
-from .helper import splitTimeRange, Memoize
 
+logger = logging.getLogger(__name__)
 
 PUBLIC_API = "https://api.smaxtec.com/api/v1"
 
+# seconds memoized reads (animal, device, organisation, ...) are reused
+CACHE_TTL = 300
+# responses kept per client for GET requests made with cache=True
+GET_CACHE_SIZE = 1024
+
+_REDIRECT_CODES = frozenset([301, 302, 303, 307, 308])
+
+_VERSION_RE = re.compile(r'\/[vV][0-9]+\/')
+
+# 19 digits in a row may be an integer orjson can not hold in 64 bit
+# (above 2**64 - 1 or below -2**63)
+_LONG_NUMBER_RE = re.compile(rb'[0-9]{19,}')
+
+# connection pool and retry settings for the per client HTTP session
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 64
+RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+              allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+              raise_on_status=False)
+
+# worker threads used for concurrent requests (async_get), shared by all
+# clients that do not ask for their own pool size
+ASYNC_WORKERS = 64
+# worker threads of the per client pool map() runs on, unless max_workers is given
+MAP_WORKERS = 16
+# get() keyword arguments the aiohttp async backend supports
+_AIOHTTP_GET_ARGS = frozenset(["version", "params", "timeout", "headers", "cache"])
+_SHARED_EXECUTOR = ThreadPoolExecutor(max_workers=ASYNC_WORKERS)
+atexit.register(_SHARED_EXECUTOR.shutdown, wait=False)
+
+
+@functools.lru_cache(maxsize=64)
+def _versioned_base(base_url, version_modifier):
+    """Return base_url with its API version segment replaced by version_modifier.
+    """
+    return _VERSION_RE.sub("/{}/".format(version_modifier), base_url + "/")[:-1]
+
+
+@functools.lru_cache(maxsize=None)
+def _expiring_memos(cls):
+    """Return the Memoize attributes with a ttl of cls and its bases, collected once per class.
+    """
+    return tuple(attr for c in cls.__mro__ for attr in vars(c).values()
+                 if isinstance(attr, Memoize) and attr.ttl is not None)
+
+
+def _query_items(params):
+    """Flatten query params into (key, str) pairs the way requests encodes them.
+    """
+    items = []
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            items.extend((key, str(v)) for v in value)
+        else:
+            items.append((key, str(value)))
+    return items
+
+
+def _make_response(status_code, reason, url, headers, content):
+    """Wrap a response of another HTTP client in a requests.Response.
+    """
+    r = requests.Response()
+    r.status_code = status_code
+    r.reason = reason
+    r.url = url
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = content
+    return r
+
+
+def _status_retry(retry, method, url, status_code):
+    """Return retry counted up for a response to retry, or None to keep the response.
+
+    Applies the status retries of a urllib3 Retry (status_forcelist and
+    allowed_methods) for HTTP clients that only retry failed connections.
+    Once the retries are used up the last response is kept, as with
+    raise_on_status=False. Sleep retry.get_backoff_time() before retrying.
+    """
+    if not retry.is_retry(method, status_code):
+        return None
+    try:
+        return retry.increment(method, url)
+    except MaxRetryError:
+        return None
+
+
+class _HttpxSession(object):
+    """The part of requests.Session the clients use, on top of an HTTP/2 httpx.Client.
+
+    Concurrent requests of one client are multiplexed over a single
+    connection per host instead of one connection each.
+    """
+
+    def __init__(self, max_connections=POOL_MAXSIZE, retry=RETRY):
+        transport = httpx.HTTPTransport(http2=True, retries=retry.total,
+                                        limits=httpx.Limits(max_connections=max_connections))
+        self._client = httpx.Client(transport=transport, timeout=None)
+        self.headers = self._client.headers
+        self.retry = retry
+
+    def request(self, method, url, params=None, data=None, allow_redirects=True, **kwargs):
+        if isinstance(data, (bytes, str)):
+            kwargs["content"] = data
+        else:
+            kwargs["data"] = data
+        retry = self.retry
+        while True:
+            r = self._client.request(method, url, params=_query_items(params),
+                                     follow_redirects=allow_redirects, **kwargs)
+            retry = _status_retry(retry, method, url, r.status_code)
+            if retry is None:
+                break
+            time.sleep(retry.get_backoff_time())
+        return _make_response(r.status_code, r.reason_phrase, str(r.url), r.headers, r.content)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        self._client.close()
+
+
+def _walk_prefix(obj, prefix):
+    """Yield what ijson.items(..., prefix) yields, from an already decoded object.
+    """
+    if not prefix:
+        yield obj
+        return
+    key, _, rest = prefix.partition(".")
+    if key == "item":
+        for item in obj:
+            yield from _walk_prefix(item, rest)
+    else:
+        yield from _walk_prefix(obj[key], rest)
+
+
+def _json_default(obj):
+    """Encode numpy values orjson can not serialize natively (e.g. non contiguous arrays).
+    """
+    if np is not None and isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError
+
+
+def _as_points(data):
+    """Return the points of a series as a list, numpy arrays are sent as they are.
+    """
+    if np is not None and isinstance(data, np.ndarray):
+        return data
+    return list(data)
+
+
+def _next_offset(res, limit):
+    """Return the offset of the page after res, or None if res is the last page.
+
+    The server signals the end with has_more=False or a missing next_offset,
+    a page shorter than limit is taken as the last one as well.
+    """
+    pagination = res.get("pagination") or {}
+    if pagination.get("has_more") is False or len(res["data"]) < limit:
+        return None
+    return pagination.get("next_offset")
+
+
+def _as_list(values):
+    """Return values as a list, without copying if it already is one.
+    """
+    if isinstance(values, list):
+        return values
+    return list(values)
+
 
 class Req(object):
+    __slots__ = ("url", "start", "status", "end")
+
     def __init__(self, url, status, start, end=None):
         self.url = url
         self.start = start
         self.status = status
         if end is None:
-            self.end = time.time()
+            self.end = time.monotonic()
         else:
             self.end = end
 
@@ -32,11 +246,107 @@ class Req(object):
         return self.end - self.start
 
 
-class BaseAPI(object):
-    def __init__(self, base_url, email=None, password=None, api_key=None, tz_aware=True):
+class _ClientMixin(object):
+    """URL building, request tracking and response handling shared by
+    BaseAPI and asynclow.AsyncBaseAPI.
+    """
+    # API version for requests that do not name one, None keeps the version of the base url
+    default_version = None
+
+    def track_request(self, url, status, start):
+        self.counter += 1
+        if self._track:
+            self.requests.append(Req(url, status, start))
+
+    def stats(self):
+        out = []
+        out.append("{} Requests".format(self.counter))
+        for r in self.requests:
+            out.append("{} in {} seconds".format(r.url, r.timer))
+        return out
+
+    def to_url(self, path, version_modifier=None):
+        if version_modifier is None:
+            version_modifier = self.default_version
+        if version_modifier is None:
+            return self.api_base_url + path
+        return _versioned_base(self.api_base_url, version_modifier) + path
+
+    @staticmethod
+    def _encode_json(kwargs):
+        """Serialize the json payload with orjson into the request body.
+
+        numpy arrays and scalars in the payload are encoded natively. Payloads
+        orjson can not encode (e.g. integers above 64 bit) are left to
+        requests and the stdlib json module. orjson writes NaN and Infinity
+        as null, the sensordata writers reject such points before sending.
+        """
+        try:
+            kwargs["data"] = orjson.dumps(kwargs["json"], default=_json_default,
+                                          option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            return
+        del kwargs["json"]
+        headers = dict(kwargs.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+        kwargs["headers"] = headers
+
+    def _handle_response(self, r, method, url, start):
+        self.track_request(url, r.status_code, start)
+        if r.status_code in _REDIRECT_CODES and method != "GET":
+            raise HTTPError("{} redirect for {}".format(r.status_code, method), response=r)
+        if 400 <= r.status_code < 500:
+            raise HTTPError("{} Error: {}".format(
+                r.status_code, self._error_message(r)), response=r)
+        r.raise_for_status()
+        return self._decode_json(r)
+
+    @staticmethod
+    def _decode_json(r):
+        """Parse a JSON response body, straight from bytes with orjson if available.
+
+        Bodies orjson rejects (e.g. NaN) or may round (integers above 64 bit)
+        are parsed by r.json() as before.
+        """
+        if orjson is not None and not _LONG_NUMBER_RE.search(r.content):
+            try:
+                return orjson.loads(r.content)
+            except orjson.JSONDecodeError:
+                pass
+        return r.json()
+
+    @staticmethod
+    def _error_message(r):
+        """Extract the "message" of a JSON error body, parsing it only once.
+
+        The body is parsed whatever its Content-Type (application/json,
+        application/problem+json, none at all, ...).
+        """
+        if not r.content:
+            return "unknown"
+        try:
+            body = _ClientMixin._decode_json(r)
+        except ValueError:
+            return "unknown"
+        if not isinstance(body, dict):
+            return "unknown"
+        return body.get("message", "unknown")
+
+
+class BaseAPI(_ClientMixin):
+    def __init__(self, base_url, email=None, password=None, api_key=None, tz_aware=True,
+                 asynchronous=False, max_workers=None, track_requests=True, async_backend="threads",
+                 http_backend="requests", http2=False, default_version=None, retries=None,
+                 backoff=None):
         """Initialize a new base low level API client instance.
+
+        http2=True is short for http_backend="httpx". retries and backoff
+        override the total and backoff factor of RETRY for this client, on
+        every HTTP and async backend.
         """
         self.api_base_url = base_url.rstrip("/")
+        if default_version is not None:
+            self.default_version = default_version
         self.email = email
         self.password = password
         self.api_key = api_key
@@ -44,8 +354,36 @@ class BaseAPI(object):
         self._session_key = None
         self._session_expiration = time.time() - 1
         self._session = None
+        self._logged_in = False
+        self._async = asynchronous
+        self.max_workers = max_workers
+        self._executor = None
+        self._map_executor = None
+        self._loop = None
+        self._aiohttp_session = None
+        self._aiohttp_lock = threading.Lock()
+        if async_backend not in ("threads", "aiohttp"):
+            raise ValueError("unknown async backend {}".format(async_backend))
+        if async_backend == "aiohttp" and aiohttp is None:
+            raise ValueError("aiohttp is needed for the aiohttp async backend")
+        self.async_backend = async_backend
+        if http2:
+            http_backend = "httpx"
+        if http_backend not in ("requests", "httpx"):
+            raise ValueError("unknown http backend {}".format(http_backend))
+        if http_backend == "httpx" and httpx is None:
+            raise ValueError("httpx is needed for the httpx http backend")
+        self.http_backend = http_backend
+        self.retry = RETRY
+        if retries is not None:
+            self.retry = self.retry.new(total=retries)
+        if backoff is not None:
+            self.retry = self.retry.new(backoff_factor=backoff)
         self.counter = 0
-        self.requests = []
+        self.requests = deque(maxlen=100)
+        self._track = track_requests
+        self._get_cache = OrderedDict()
+        self._get_cache_lock = threading.Lock()
         self.tz_aware = tz_aware
 
     @property
@@ -53,31 +391,114 @@ class BaseAPI(object):
         """Geneate a new HTTP session on the fly and login.
         """
         if not self._session:
-            self._session = requests.Session()
-        # check login
-        if not self._login():
-            raise ValueError("invalid login information")
+            self._session = self._create_session()
+        # check login only until logged in and again once the token expires
+        if not self._logged_in or time.time() > self._session_expiration:
+            if not self._login():
+                raise ValueError("invalid login information")
         return self._session
 
-    def track_request(self, url, status, start):
-        self.counter += 1
-        self.requests.append(Req(url, status, start))
-        if len(self.requests) > 100:
-            self.requests.pop(0)
+    @property
+    def executor(self):
+        """Thread pool for concurrent requests.
 
-    def stats(self):
-        out = []
-        out.append("{} Requests".format(self.counter))
-        for r in self.requests:
-            out.append("{} in {} seconds".format(r.url, r.timer))
-        return out
+        Clients share one module level pool unless max_workers is given.
+        """
+        if self._executor is None:
+            if self.max_workers is None:
+                self._executor = _SHARED_EXECUTOR
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
 
-    def to_url(self, path, version_modifier=None):
-        url = "{}{}".format(self.api_base_url, path)
-        if version_modifier is not None:
-            url = re.sub(r'\/[vV][0-9]+\/',
-                         "/{}/".format(version_modifier), url)
-        return url
+    def close(self):
+        """Close the HTTP sessions and a client owned thread pool.
+
+        The client stays usable, the next request opens a new session.
+        """
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        with self._aiohttp_lock:
+            if self._aiohttp_session is not None:
+                self._loop.run_until_complete(self._aiohttp_session.close())
+            if self._loop is not None:
+                self._loop.close()
+            self._aiohttp_session = None
+            self._loop = None
+        self._logged_in = False
+        self._session_expiration = time.time() - 1
+        if self._executor is not None and self._executor is not _SHARED_EXECUTOR:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        if self._map_executor is not None:
+            self._map_executor.shutdown(wait=False)
+        self._map_executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _create_session(self):
+        """Create a keep-alive HTTP session with a pooled, retrying adapter.
+        """
+        pool_maxsize = max(POOL_MAXSIZE, self.max_workers or 0)
+        if self.http_backend == "httpx":
+            return _HttpxSession(max_connections=pool_maxsize, retry=self.retry)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                              pool_maxsize=pool_maxsize, max_retries=self.retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def invalidate_cache(self):
+        """Drop the expiring memoized reads and cached GET responses of this client.
+
+        Memoized values without a ttl (e.g. organisation timezones) are kept.
+        """
+        for memo in _expiring_memos(type(self)):
+            memo.cache_clear(self)
+        self._clear_get_cache()
+
+    def _clear_get_cache(self):
+        with self._get_cache_lock:
+            self._get_cache.clear()
+
+    def _cached_get(self, path, params=None, version=None, **kwargs):
+        """GET through a bounded per client LRU cache expiring after CACHE_TTL.
+
+        Any non GET request of the client clears the cache, together with
+        the memoized reads (see invalidate_cache). Callers get their own copy
+        of a cached response, so changing it leaves the cache intact. Meant
+        for small, often repeated reads and not for bulk sensordata.
+        """
+        key = (path, version, tuple(_query_items(params)))
+        hit = self._cache_lookup(key)
+        if hit is not None:
+            return hit[0]
+        res = self._request("GET", path, version=version, params=params, **kwargs)
+        self._cache_store(key, res)
+        return res
+
+    def _cache_lookup(self, key):
+        """Return (response,) for an unexpired GET cache entry, else None.
+        """
+        with self._get_cache_lock:
+            hit = self._get_cache.get(key)
+            if hit is not None and hit[1] > time.monotonic():
+                self._get_cache.move_to_end(key)
+                return (copy.deepcopy(hit[0]),)
+        return None
+
+    def _cache_store(self, key, res):
+        with self._get_cache_lock:
+            self._get_cache[key] = (copy.deepcopy(res), time.monotonic() + CACHE_TTL)
+            self._get_cache.move_to_end(key)
+            if len(self._get_cache) > GET_CACHE_SIZE:
+                self._get_cache.popitem(last=False)
 
     def _login(self):
         """Login to the api with api key or the given credentials.
@@ -92,6 +513,7 @@ class BaseAPI(object):
             self._session.headers.update(
                 {"Authorization": "Bearer {}".format(self._session_key)})
             self._session_expiration = time.time() + 365 * 24 * 60 * 60
+            self._logged_in = True
             return True
         # login with credentials
         if self.email is None or self.password is None:
@@ -108,84 +530,244 @@ class BaseAPI(object):
         self._session.headers.update(
             {"Authorization": "Bearer {}".format(self._session_key)})
         self._session_expiration = time.time() + 23 * 60 * 60
+        self._logged_in = True
         return True
 
-    def get(self, path, *args, **kwargs):
-        version = kwargs.pop("version", None)
-        url = self.to_url(path, version)
-        start = time.time()
-        r = self.session.get(url, *args, **kwargs)
-        self.track_request(url, r.status_code, start)
-        if 400 <= r.status_code < 500:
-            try:
-                msg = r.json().get("message", "unknown")
-            except Exception:
-                msg = "unknown"
-            raise HTTPError("{} Error: {}".format(
-                r.status_code, msg))
-        r.raise_for_status()
-        return r.json()
+    def _paginate(self, path, params, version=None):
+        """Collect all pages of a limit/offset paginated endpoint.
 
-    def post(self, path, *args, **kwargs):
-        version = kwargs.pop("version", None)
-        url = self.to_url(path, version)
-        start = time.time()
-        r = self.session.post(url, *args, allow_redirects=False, **kwargs)
-        self.track_request(url, r.status_code, start)
-        if r.status_code == 301:
-            raise HTTPError("301 redirect for POST")
-        if 400 <= r.status_code < 500:
-            try:
-                msg = r.json().get("message", "unknown")
-            except Exception:
-                msg = "unknown"
-            raise HTTPError("{} Error: {}".format(
-                r.status_code, msg))
-        r.raise_for_status()
-        return r.json()
+        params is built once by the caller and reused for every page, only
+        its "offset" is updated in place.
 
-    def put(self, path, *args, **kwargs):
-        version = kwargs.pop("version", None)
-        url = self.to_url(path, version)
-        start = time.time()
-        r = self.session.put(url, *args, allow_redirects=False, **kwargs)
-        self.track_request(url, r.status_code, start)
-        if r.status_code == 301:
-            raise HTTPError("301 redirect for PUT")
-        if 400 <= r.status_code < 500:
+        If the client is asynchronous and the first page reports the total
+        number of items, the remaining pages are fetched concurrently.
+        """
+        all_res = []
+        while True:
+            res = self.get(path, params=params, version=version)
+            all_res += res["data"]
+            next_offset = _next_offset(res, params["limit"])
+            if next_offset is None:
+                break
+            pagination = res["pagination"]
+            if self._async and "total" in pagination:
+                offsets = range(next_offset, pagination["total"], params["limit"])
+                pages = self.async_get([(path, dict(params, offset=o)) for o in offsets],
+                                       version=version)
+                for page in pages:
+                    all_res += page["data"]
+                break
+            params["offset"] = next_offset
+        return all_res
+
+    def _paginate_iter(self, path, params, version=None):
+        """Yield the items of a limit/offset paginated endpoint page by page.
+
+        While the items of a page are consumed the next page is already
+        requested in the background, at most these two pages are held in
+        memory.
+        """
+        res = self.get(path, params=params, version=version)
+        while True:
+            pending = None
+            next_offset = _next_offset(res, params["limit"])
+            if next_offset is not None:
+                params = dict(params, offset=next_offset)
+                pending = self.executor.submit(self.get, path, params=params, version=version)
             try:
-                msg = r.json().get("message", "unknown")
-            except Exception:
-                msg = "unknown"
-            raise HTTPError("{} Error: {}".format(
-                r.status_code, msg))
-        r.raise_for_status()
-        return r.json()
+                yield from res["data"]
+            except GeneratorExit:
+                if pending is not None:
+                    pending.cancel()
+                raise
+            if pending is None:
+                return
+            res = pending.result()
+
+    def async_get(self, requests_list, version=None, raise_on_error=True, **shared_kwargs):
+        """Run several GET requests concurrently and return the results in order.
+
+        Every item is either a path, a (path, params) tuple or a dict with a
+        "path" key and further per request keyword arguments for get().
+        shared_kwargs are passed to every request. With raise_on_error=False
+        a failed request is logged and leaves None at its position instead of
+        raising.
+
+        With the "aiohttp" async backend the requests run on an event loop
+        of the client instead of the thread pool, which keeps its aiohttp
+        session (and connections) until close(). async_get must not be
+        called from a running event loop then, concurrent calls from several
+        threads run one after the other. Of the get() keyword arguments only
+        version, params, timeout, headers and cache are supported there.
+        """
+        # login once before fanning out
+        self.session
+        calls = []
+        for item in requests_list:
+            if isinstance(item, str):
+                item = {"path": item}
+            elif isinstance(item, tuple):
+                item = {"path": item[0], "params": item[1]}
+            kwargs = dict(shared_kwargs, version=version)
+            kwargs.update(item)
+            calls.append((kwargs.pop("path"), kwargs))
+        if self.async_backend == "aiohttp":
+            for path, kwargs in calls:
+                unsupported = set(kwargs) - _AIOHTTP_GET_ARGS
+                if unsupported:
+                    raise TypeError("get() arguments not supported by the aiohttp async backend: {}".format(
+                        ", ".join(sorted(unsupported))))
+            with self._aiohttp_lock:
+                if self._loop is None:
+                    self._loop = asyncio.new_event_loop()
+                results = self._loop.run_until_complete(self._aiohttp_get(calls, raise_on_error))
+        else:
+            futures = {self.executor.submit(self.get, path, **kwargs): i
+                       for i, (path, kwargs) in enumerate(calls)}
+            results = [None] * len(calls)
+            # drain in completion order so a failure surfaces without waiting
+            # for slower requests submitted before it
+            for f in as_completed(futures):
+                try:
+                    results[futures[f]] = f.result()
+                except Exception as e:
+                    if raise_on_error:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+                    results[futures[f]] = e
+        for i, (path, kwargs) in enumerate(calls):
+            if isinstance(results[i], Exception):
+                logger.warning("async_get failed for %s: %s",
+                               self.to_url(path, kwargs.get("version")), results[i])
+                results[i] = None
+        return results
+
+    async def _aiohttp_get(self, calls, raise_on_error=True):
+        """Run the GET requests on the client loop with its aiohttp connection pool.
+
+        On the first failure the other requests are cancelled, unless
+        raise_on_error is False; then the exceptions are returned in place.
+        """
+        if not calls:
+            return []
+        if self._aiohttp_session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_workers or ASYNC_WORKERS)
+            self._aiohttp_session = aiohttp.ClientSession(connector=connector)
+        auth = self._session.headers["Authorization"]
+        tasks = [asyncio.ensure_future(self._aiohttp_request(auth, path, **kwargs))
+                 for path, kwargs in calls]
+        done, pending = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_EXCEPTION if raise_on_error else asyncio.ALL_COMPLETED)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if raise_on_error:
+            for t in tasks:
+                if t in done and t.exception() is not None:
+                    raise t.exception()
+        return [t.exception() or t.result() for t in tasks]
+
+    async def _aiohttp_request(self, auth, path, version=None, params=None, timeout=None, headers=None,
+                               cache=False):
+        if cache:
+            key = (path, version, tuple(_query_items(params)))
+            hit = self._cache_lookup(key)
+            if hit is not None:
+                return hit[0]
+        url = self.to_url(path, version)
+        kwargs = {"params": _query_items(params), "headers": dict(headers or {}, Authorization=auth)}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        start = time.monotonic()
+        retry = self.retry
+        while True:
+            async with self._aiohttp_session.get(url, **kwargs) as resp:
+                # hand a plain requests response to the shared status handling
+                r = _make_response(resp.status, resp.reason, str(resp.url), resp.headers,
+                                   await resp.read())
+            retry = _status_retry(retry, "GET", url, r.status_code)
+            if retry is None:
+                break
+            await asyncio.sleep(retry.get_backoff_time())
+        res = self._handle_response(r, "GET", url, start)
+        if cache:
+            self._cache_store(key, res)
+        return res
 
-    def delete(self, path, *args, **kwargs):
-        version = kwargs.pop("version", None)
+    def map(self, method, iterable_of_kwargs):
+        """Call method (e.g. api.getUploads) once per kwargs dict concurrently.
+
+        Results are returned in the order of iterable_of_kwargs. The calls
+        run on a pool of the client (max_workers or MAP_WORKERS threads,
+        kept until close()) apart from the executor, so methods that use
+        async_get themselves can not starve it.
+        """
+        # login once before fanning out
+        self.session
+        if self._map_executor is None:
+            self._map_executor = ThreadPoolExecutor(max_workers=self.max_workers or MAP_WORKERS)
+        futures = [self._map_executor.submit(method, **kwargs) for kwargs in iterable_of_kwargs]
+        return [f.result() for f in futures]
+
+    def _request(self, method, path, version=None, **kwargs):
         url = self.to_url(path, version)
-        start = time.time()
-        r = self.session.delete(url, *args, **kwargs)
-        self.track_request(url, r.status_code, start)
-        if 400 <= r.status_code < 500:
-            try:
-                msg = r.json().get("message", "unknown")
-            except Exception:
-                msg = "unknown"
-            raise HTTPError("{} Error: {}".format(
-                r.status_code, msg))
-        r.raise_for_status()
-        return r.json()
+        # never resend a request body (or a DELETE) to a redirect target
+        if method != "GET":
+            kwargs["allow_redirects"] = False
+            # a write may change anything read before, memoized or cached
+            self.invalidate_cache()
+        if orjson is not None and kwargs.get("json") is not None:
+            self._encode_json(kwargs)
+        start = time.monotonic()
+        r = self.session.request(method, url, **kwargs)
+        return self._handle_response(r, method, url, start)
+
+    def get(self, path, params=None, cache=False, **kwargs):
+        if cache:
+            return self._cached_get(path, params=params, **kwargs)
+        return self._request("GET", path, params=params, **kwargs)
+
+    def get_stream(self, path, params=None, prefix="item", version=None, **kwargs):
+        """GET a JSON response and yield the objects at prefix while it downloads.
+
+        prefix uses the ijson notation, "item" yields the elements of a top
+        level array. Without ijson (or with the httpx backend) the response
+        is decoded as a whole and walked the same way.
+        """
+        if ijson is None or self.http_backend != "requests":
+            yield from _walk_prefix(self.get(path, params=params, version=version, **kwargs), prefix)
+            return
+        url = self.to_url(path, version)
+        start = time.monotonic()
+        r = self.session.request("GET", url, params=params, stream=True, **kwargs)
+        with r:
+            if r.status_code >= 400:
+                self._handle_response(r, "GET", url, start)
+            self.track_request(url, r.status_code, start)
+            r.raw.decode_content = True
+            yield from ijson.items(r.raw, prefix, use_float=True)
+
+    def post(self, path, data=None, json=None, **kwargs):
+        return self._request("POST", path, data=data, json=json, **kwargs)
+
+    def put(self, path, data=None, json=None, **kwargs):
+        return self._request("PUT", path, data=data, json=json, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self._request("DELETE", path, **kwargs)
 
 
 class LowLevelPublicAPI(BaseAPI):
-    def __init__(self, email=None, password=None, api_key=None, endpoint=None, tz_aware=True):
+    def __init__(self, email=None, password=None, api_key=None, endpoint=None, tz_aware=True, **kwargs):
         """Initialize a new low level API client instance.
+
+        Further keyword arguments are passed on to BaseAPI.
         """
         ep = endpoint or PUBLIC_API
         super(LowLevelPublicAPI, self).__init__(ep, email=email,
-                                                password=password, api_key=api_key, tz_aware=tz_aware)
+                                                password=password, api_key=api_key, tz_aware=tz_aware,
+                                                **kwargs)
 
     def get_status(self):
         return self.get("/service/status")
@@ -207,42 +789,43 @@ class LowLevelPublicAPI(BaseAPI):
         animal_ids = self.get("/animal/ids_by_organisation", params=params)
         return [x["_id"] for x in animal_ids]
 
+    @Memoize.expiring(CACHE_TTL)
     def get_animal_by_id(self, animal_id):
         params = HDict({"animal_id": animal_id})
         return self.get("/animal/by_id", params=params)
 
+    @Memoize.expiring(CACHE_TTL)
     def get_device_by_id(self, device_id):
         params = HDict({"device_id": device_id})
         return self.get("/device/by_id", params=params)
 
+    @Memoize.expiring(CACHE_TTL)
     def get_organisation_by_id(self, organisation_id):
         params = HDict({"organisation_id": organisation_id})
         return self.get("/organisation/by_id", params=params)
 
     def get_device_sensordata(self, device_id, metric, from_date, to_date):
-        data = []
-        for f, t in splitTimeRange(from_date, to_date, 100):
-            data += self._get_device_sensordata(device_id,
-                                                metric, f, t)["data"]
-        return data
-
-    def _get_device_sensordata(self, device_id, metric, from_date, to_date):
-        params = HDict({"device_id": device_id, "metric": metric,
-                        "from_date": from_date, "to_date": to_date})
-        return self.get("/data/query", params=params)
+        return self._query_sensordata({"device_id": device_id, "metric": metric},
+                                      from_date, to_date)
 
     def get_animal_sensordata(self, animal_id, metric, from_date, to_date):
+        return self._query_sensordata({"animal_id": animal_id, "metric": metric},
+                                      from_date, to_date)
+
+    def _query_sensordata(self, query, from_date, to_date):
+        """Query sensordata in 100 day chunks, concurrently if asynchronous.
+        """
+        params = [HDict(query, from_date=f, to_date=t)
+                  for f, t in splitTimeRange(from_date, to_date, 100)]
+        if self._async:
+            pages = self.async_get([("/data/query", p) for p in params])
+        else:
+            pages = (self.get("/data/query", params=p) for p in params)
         data = []
-        for f, t in splitTimeRange(from_date, to_date, 100):
-            data += self._get_animal_sensordata(animal_id,
-                                                metric, f, t)["data"]
+        for page in pages:
+            data.extend(page["data"])
         return data
 
-    def _get_animal_sensordata(self, animal_id, metric, from_date, to_date):
-        params = HDict({"animal_id": animal_id, "metric": metric,
-                        "from_date": from_date, "to_date": to_date})
-        return self.get("/data/query", params=params)
-
     def get_animal_events(self, animal_id, from_date=None, to_date=None,
                           limit=100, offset=0):
         if from_date:
@@ -250,18 +833,10 @@ class LowLevelPublicAPI(BaseAPI):
         if to_date:
             to_date = int(to_date)
 
-        params = HDict({"animal_id": animal_id, "limit": limit,
-                        "offset": offset, "from_date": from_date,
-                        "to_date": to_date})
-        all_events = []
-        while True:
-            events = self.get("/event/query", params=params)
-            all_events += events["data"]
-            if len(events["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = events["pagination"]["next_offset"]
-        return all_events
+        params = QueryParams({"animal_id": animal_id, "limit": limit,
+                              "offset": offset, "from_date": from_date,
+                              "to_date": to_date})
+        return self._paginate("/event/query", params)
 
     def get_device_events(self, device_id, from_date=None, to_date=None):
         if from_date:
@@ -269,75 +844,38 @@ class LowLevelPublicAPI(BaseAPI):
         if to_date:
             to_date = int(to_date)
 
-        params = HDict({"device_id": device_id, "limit": 100, "offset": 0,
-                        "from_date": from_date, "to_date": to_date})
-        all_events = []
-        while True:
-            events = self.get("/event/query", params=params)
-            all_events += events["data"]
-            if len(events["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = events["pagination"]["next_offset"]
-        return all_events
+        params = QueryParams({"device_id": device_id, "limit": 100, "offset": 0,
+                              "from_date": from_date, "to_date": to_date})
+        return self._paginate("/event/query", params)
 
     def get_events_by_organisation(self, organisation_id, from_date, to_date, categories=None):
-        params = HDict({"organisation_id": organisation_id, "offset": 0, "limit": 100,
-                        "from_date": int(from_date), "to_date": int(to_date),
-                        "categories": categories})
-        all_res = []
-        while True:
-            res = self.get("/event/by_organisation", params=params)
-            all_res += res["data"]
-            if len(res["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = res["pagination"]["next_offset"]
-        return all_res
+        params = QueryParams({"organisation_id": organisation_id, "offset": 0, "limit": 100,
+                              "from_date": int(from_date), "to_date": int(to_date),
+                              "categories": categories})
+        return self._paginate("/event/by_organisation", params)
 
     def get_annotation_by_id(self, annotation_id):
         params = HDict({"annotation_id": annotation_id})
         return self.get("/annotation/id", params=params)
 
     def get_animal_annotations(self, animal_id, from_date, to_date):
-        params = HDict({"to_date": to_date, "from_date": from_date, "limit": 100,
-                        "offset": 0, "animal_id": animal_id})
-        all_annotations = []
-        while True:
-            annotations = self.get("/annotation/query", params=params)
-            all_annotations += annotations["data"]
-            if len(annotations["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = annotations["pagination"]["next_offset"]
-        return all_annotations
+        params = QueryParams({"to_date": to_date, "from_date": from_date, "limit": 100,
+                              "offset": 0, "animal_id": animal_id})
+        return self._paginate("/annotation/query", params)
 
     def get_annotations_by_class(self, annotation_class, from_date, to_date):
-        params = HDict({"to_date": to_date, "from_date": from_date, "limit": 100,
-                        "offset": 0, "annotation_class": annotation_class})
-        all_annotations = []
-        while True:
-            annotations = self.get("/annotation/query", params=params)
-            all_annotations += annotations["data"]
-            if len(annotations["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = annotations["pagination"]["next_offset"]
-        return all_annotations
+        params = QueryParams({"to_date": to_date, "from_date": from_date, "limit": 100,
+                              "offset": 0, "annotation_class": annotation_class})
+        return self._paginate("/annotation/query", params)
 
     def get_annotations_by_organisation(self, organisation_id, from_date, to_date):
-        params = HDict({"to_date": to_date, "from_date": from_date, "limit": 100,
-                        "offset": 0, "organisation_id": organisation_id})
-        all_annotations = []
-        while True:
-            annotations = self.get("/annotation/query", params=params)
-            all_annotations += annotations["data"]
-            if len(annotations["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = annotations["pagination"]["next_offset"]
-        return all_annotations
+        params = QueryParams({"to_date": to_date, "from_date": from_date, "limit": 100,
+                              "offset": 0, "organisation_id": organisation_id})
+        return self._paginate("/annotation/query", params)
 
+    # the annotation schema only changes with server deployments, never
+    # through the data this client or others write
+    @Memoize.expiring(CACHE_TTL)
     def get_annotation_definition(self):
         return self.get("/annotation/definition")
 
@@ -399,13 +937,15 @@ class LowLevelPublicAPI(BaseAPI):
 
 
 class LowLevelInternAPI(BaseAPI):
-    def __init__(self, endpoint, api_key=None, tz_aware=True):
+    def __init__(self, endpoint, api_key=None, tz_aware=True, **kwargs):
         """Initialize a new low level intern API client instance.
+
+        Further keyword arguments are passed on to BaseAPI.
         """
         if not endpoint:
             raise ValueError("Endpoint needed for low level API")
         super(LowLevelInternAPI, self).__init__(
-            endpoint, api_key=api_key, tz_aware=tz_aware)
+            endpoint, api_key=api_key, tz_aware=tz_aware, **kwargs)
 
     def get_status(self):
         return self._api_status()
@@ -416,7 +956,7 @@ class LowLevelInternAPI(BaseAPI):
 
     def healthy(self):
         try:
-            assert(self._api_status())
+            assert self._api_status()
         except Exception as e:
             logging.error("Status Not Ok: %s", e)
             return False
@@ -425,37 +965,23 @@ class LowLevelInternAPI(BaseAPI):
 
     def insertSensorData(self, device_id, metric, data):
         d = [{"device_id": device_id, "metric": metric,
-              "data": list(data)}]
+              "data": _as_points(data)}]
         return self.insertSensorDataBulk(d)[0]
 
     def insertSensorDataBulk(self, sensordata):
-        data = HDict({"sensordata": list(sensordata)})
-        for s in sensordata:
-            d = s["data"]
-            for point in d:
-                if not isinstance(point[0], (int, float)):
-                    raise ValueError("Invalid TS Point: %s of metric %s",
-                                     (point, s["metric"]))
-                if not isinstance(point[1], (int, float)):
-                    raise ValueError("Invalid VALUE Point: %s of metric %s",
-                                     (point, s["metric"]))
+        data = HDict({"sensordata": _as_list(sensordata)})
+        checkSensorData(data["sensordata"])
         res = self.put("/sensordatabulk", json=data, timeout=25)
         return res
 
     def updateSensorData(self, device_id, metric, data):
         d = [{"device_id": device_id, "metric": metric,
-              "data": list(data)}]
+              "data": _as_points(data)}]
         return self.updateSensorDataBulk(d)[0]
 
     def updateSensorDataBulk(self, sensordata):
-        data = HDict({"sensordata": list(sensordata)})
-        for s in sensordata:
-            d = s["data"]
-            for point in d:
-                if not isinstance(point[0], (int, float)):
-                    raise ValueError("Invalid TS Point: %s", point)
-                if not isinstance(point[1], (int, float)):
-                    raise ValueError("Invalid VALUE Point: %s", point)
+        data = HDict({"sensordata": _as_list(sensordata)})
+        checkSensorData(data["sensordata"])
         res = self.post("/sensordatabulk", json=data, timeout=25)
         return res
 
@@ -469,7 +995,7 @@ class LowLevelInternAPI(BaseAPI):
         return res
 
     def getSensorDataBulk(self, device_id, metrics, from_date, to_date):
-        params = HDict({"device_id": device_id, "metrics": list(metrics),
+        params = HDict({"device_id": device_id, "metrics": _as_list(metrics),
                         "from_date": from_date, "to_date": to_date})
         res = self.get("/sensordatabulk", params=params, timeout=15)
         return res
@@ -478,7 +1004,7 @@ class LowLevelInternAPI(BaseAPI):
         return self.getLastSensorDataBulk(device_id, [metric])[0]
 
     def getLastSensorDataBulk(self, device_id, metrics):
-        params = HDict({"device_id": device_id, "metrics": list(metrics)})
+        params = HDict({"device_id": device_id, "metrics": _as_list(metrics)})
         res = self.get("/lastsensordata", params=params)
         return res
 
@@ -539,31 +1065,15 @@ class LowLevelInternAPI(BaseAPI):
 
     def query_organisations(self, name_search_string=None, partner_id=None,
                             active_test_package=None):
-        params = HDict({"name_search_string": name_search_string, "limit": 100,
-                        "offset": 0, "partner_id": partner_id,
-                        "active_test_package": active_test_package})
-        all_res = []
-        while True:
-            res = self.get("/organisation/list", params=params, version="v1")
-            all_res += res["data"]
-            if len(res["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = res["pagination"]["next_offset"]
-        return all_res
+        params = QueryParams({"name_search_string": name_search_string, "limit": 100,
+                              "offset": 0, "partner_id": partner_id,
+                              "active_test_package": active_test_package})
+        return self._paginate("/organisation/list", params, version="v1")
 
     def query_accounts(self, name_search_string=None, partner_id=None):
-        params = HDict({"name_search_string": name_search_string, "limit": 100,
-                        "offset": 0, "partner_id": partner_id})
-        all_res = []
-        while True:
-            res = self.get("/account/list", params=params, version="v1")
-            all_res += res["data"]
-            if len(res["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = res["pagination"]["next_offset"]
-        return all_res
+        params = QueryParams({"name_search_string": name_search_string, "limit": 100,
+                              "offset": 0, "partner_id": partner_id})
+        return self._paginate("/account/list", params, version="v1")
 
     def get_account(self, account_id):
         res = self.get("/account/{}".format(account_id), version="v1")
@@ -644,6 +1154,10 @@ class LowLevelInternAPI(BaseAPI):
         res = self.get("/anthilluploadbulk", params=p)
         return res
 
+    def getUploadsMany(self, device_ids, from_date, to_date):
+        return self.map(self.getUploads, [{"device_id": d, "from_date": from_date, "to_date": to_date}
+                                          for d in device_ids])
+
     def lastProductionDevices(self, device_id=None, skip=0, limit=10):
         p = HDict({"skip": int(skip), "limit": int(limit)})
         if device_id:
@@ -652,22 +1166,21 @@ class LowLevelInternAPI(BaseAPI):
         return res
 
     def query_users(self, email_search_string=None):
-        params = HDict({"email_search_string": email_search_string, "limit": 100,
-                        "offset": 0})
-        all_res = []
-        while True:
-            res = self.get("/user/list", params=params, version="v1")
-            all_res += res["data"]
-            if len(res["data"]) < params["limit"]:
-                break
-            else:
-                params["offset"] = res["pagination"]["next_offset"]
-        return all_res
+        params = QueryParams({"email_search_string": email_search_string, "limit": 100,
+                              "offset": 0})
+        return self._paginate("/user/list", params, version="v1")
+
+    def query_users_iter(self, email_search_string=None):
+        """Like query_users, but yield the users while the pages come in.
+        """
+        params = QueryParams({"email_search_string": email_search_string, "limit": 100,
+                              "offset": 0})
+        return self._paginate_iter("/user/list", params, version="v1")
 
     def get_hidden_shares(self, user_id):
         params = HDict({"user_id": user_id})
         res = self.get("/user/hidden_shares_by_user",
-                       params=params, version="v1")
+                       params=params, version="v1", cache=True)
         return res
 
     def delete_hidden_share(self, share_id):
@@ -688,7 +1201,7 @@ class LowLevelInternAPI(BaseAPI):
 
     def search_devices(self, search_string):
         p = HDict({"search_string": search_string})
-        res = self.get("/devicesearch", params=p)
+        res = self.get("/devicesearch", params=p, cache=True)
         return res
 
     def get_device_uploads(self, from_ts, to_ts, device_id):
@@ -699,9 +1212,19 @@ class LowLevelInternAPI(BaseAPI):
         })
         return self.get("/anthilluploadbulk", params=params)
 
+    def get_device_uploads_iter(self, from_ts, to_ts, device_id, days=1):
+        """Yield (from_ts, to_ts, uploads) for consecutive windows of days.
+
+        Windows are requested one at a time, so a long export holds one
+        window in memory, can stop early and can resume after the last
+        to_ts it saw.
+        """
+        for f, t in splitTimeRange(from_ts, to_ts, days):
+            yield f, t, self.get_device_uploads(f, t, device_id)
+
     def get_animals_by_organisation(self, organisation_id):
         p = HDict({"organisation_id": organisation_id})
-        res = self.get("/animallist", params=p)
+        res = self.get("/animallist", params=p, cache=True)
         return res
 
     def move_device(self, device_id, organisation_id):
@@ -727,34 +1250,35 @@ class LowLevelInternAPI(BaseAPI):
         return res
 
     def getGroupSensorDataBulk(self, group_id, metrics, from_date, to_date):
-        params = HDict({"group_id": group_id, "metrics": list(metrics),
+        params = HDict({"group_id": group_id, "metrics": _as_list(metrics),
                         "from_date": from_date, "to_date": to_date})
         res = self.get("/groupsensordatabulk", params=params, timeout=15)
         return res
 
+    def getGroupSensorDataBulkIter(self, group_id, metrics, from_date, to_date):
+        """Like getGroupSensorDataBulk, but yield the series while the response downloads.
+        """
+        params = HDict({"group_id": group_id, "metrics": _as_list(metrics),
+                        "from_date": from_date, "to_date": to_date})
+        return self.get_stream("/groupsensordatabulk", params=params, timeout=15)
+
     def insertGroupSensorDataBulk(self, sensordata):
-        data = HDict({"sensordata": list(sensordata)})
-        for s in sensordata:
-            d = s["data"]
-            for point in d:
-                if not isinstance(point[0], (int, float)):
-                    raise ValueError("Invalid TS Point: %s of metric %s",
-                                     (point, s["metric"]))
-                if not isinstance(point[1], (int, float)):
-                    raise ValueError("Invalid VALUE Point: %s of metric %s",
-                                     (point, s["metric"]))
+        data = HDict({"sensordata": _as_list(sensordata)})
+        checkSensorData(data["sensordata"])
         res = self.put("/groupsensordatabulk", json=data, timeout=25)
         return res
 
 
 class LowLevelInternAPIV2(BaseAPI):
-    def __init__(self, endpoint, api_key=None, tz_aware=True):
+    def __init__(self, endpoint, api_key=None, tz_aware=True, **kwargs):
         """Initialize a new low level intern API client instance.
+
+        Further keyword arguments are passed on to BaseAPI.
         """
         if not endpoint:
             raise ValueError("Endpoint needed for low level API")
         super().__init__(
-            endpoint, api_key=api_key, tz_aware=tz_aware)
+            endpoint, api_key=api_key, tz_aware=tz_aware, **kwargs)
 
     def create_device_update(self, name, update_type, update_content,
                              information):
@@ -23,6 +23,18 @@ class HDict(dict):
         return hash(frozenset(self.items()))
 
 
+class QueryParams(HDict):
+    """HDict for query parameters with optional filters.
+
+    None values are dropped once on creation instead of being carried
+    through every page request of a paginated query.
+    """
+    def __init__(self, *args, **kwargs):
+        super(QueryParams, self).__init__(*args, **kwargs)
+        for key in [k for k, v in self.items() if v is None]:
+            del self[key]
+
+
 class APIObject(object):
     def __init__(self, api, _id):
         self.api = api
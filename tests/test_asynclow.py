@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import asyncio
+import json
+
+import mock
+from requests.exceptions import HTTPError
+
+from .util import LocalServer
+from sxapi import asynclow
+from sxapi.asynclow import AsyncBaseAPI, AsyncLowLevelInternAPI
+
+
+@unittest.skipIf(asynclow.aiohttp is None, "aiohttp not installed")
+class AsyncLowApiTests(unittest.IsolatedAsyncioTestCase):
+    INTERN_ENDPOINT = "http://0.0.0.0:8787/internapi/v0"
+    API_KEY = "abcd"
+
+    async def test_get_uploads(self):
+        api = AsyncLowLevelInternAPI(self.INTERN_ENDPOINT, api_key=self.API_KEY)
+        with mock.patch("sxapi.asynclow.AsyncBaseAPI.get", new_callable=mock.AsyncMock) as patched_session:
+            await api.getUploads("1234567890", 1000.5, 2000)
+            call = patched_session.call_args_list
+            self.assertEqual(call[0][0][0], "/anthilluploadbulk")
+            self.assertEqual(call[0][1]["params"], {"device_id": "1234567890", "from_date": 1000, "to_date": 2000})
+
+    async def test_query_users(self):
+        api = AsyncLowLevelInternAPI(self.INTERN_ENDPOINT, api_key=self.API_KEY)
+        pages = [
+            {"data": list(range(100)), "pagination": {"next_offset": 100}},
+            {"data": list(range(100, 150)), "pagination": {"next_offset": 150}},
+        ]
+        with mock.patch("sxapi.asynclow.AsyncBaseAPI.get", new_callable=mock.AsyncMock,
+                        side_effect=pages) as patched_session:
+            res = await api.query_users("foo")
+            self.assertEqual(res, list(range(150)))
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 2)
+            self.assertEqual(call[0][0][0], "/user/list")
+            self.assertEqual(call[0][1]["version"], "v1")
+
+    async def test_group_sensordata_validation(self):
+        api = AsyncLowLevelInternAPI(self.INTERN_ENDPOINT, api_key=self.API_KEY)
+        with mock.patch("sxapi.asynclow.AsyncBaseAPI.put", new_callable=mock.AsyncMock) as patched_session:
+            with self.assertRaises(ValueError):
+                await api.insertGroupSensorDataBulk([{"metric": "temp", "data": [[1, "x"]]}])
+            self.assertEqual(len(patched_session.call_args_list), 0)
+
+    async def test_requests(self):
+        with LocalServer({"/api/v0/err400": [(400, {"message": "bad thing"})]}) as server:
+            async with AsyncLowLevelInternAPI(server.url, api_key=self.API_KEY) as api:
+                res = await api.get_hidden_shares("my_user_id")
+                self.assertEqual(res["path"], "/api/v1/user/hidden_shares_by_user")
+                self.assertEqual(res["query"], {"user_id": ["my_user_id"]})
+                self.assertEqual(res["auth"], "Bearer abcd")
+                res = await api.create_hidden_share("my_org_id", "my_user_id")
+                self.assertEqual(res["method"], "PUT")
+                self.assertEqual(json.loads(res["body"]), {"organisation_id": "my_org_id", "user_id": "my_user_id"})
+                with self.assertRaises(HTTPError) as error:
+                    await api.get("/err400")
+                self.assertEqual(str(error.exception), "400 Error: bad thing")
+                self.assertEqual(api.counter, 3)
+                session = api._session
+            self.assertIsNone(api._session)
+            self.assertTrue(session.closed)
+
+    async def test_login(self):
+        routes = {"/api/v0/user/get_token": [(200, {"token": "t0k"})]}
+        with LocalServer(routes) as server:
+            async with AsyncBaseAPI(server.url, email="user@smaxtec.com", password="pw") as api:
+                res = await asyncio.gather(*[api.get("/user") for _ in range(3)])
+                self.assertEqual([r["auth"] for r in res], ["Bearer t0k"] * 3)
+                logins = [c for c in server.calls if c["path"] == "/api/v0/user/get_token"]
+                self.assertEqual(len(logins), 1)
+                self.assertEqual(logins[0]["query"], {"email": ["user@smaxtec.com"], "password": ["pw"]})
+            server.routes["/api/v0/user/get_token"] = [(401, {})]
+            async with AsyncBaseAPI(server.url, email="user@smaxtec.com", password="wrong") as api:
+                with self.assertRaises(ValueError):
+                    await api.get("/user")
+            async with AsyncBaseAPI(server.url) as api:
+                with self.assertRaises(ValueError):
+                    await api.get("/user")
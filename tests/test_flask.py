@@ -6,7 +6,7 @@ import unittest
 from flask import Flask
 
 from sxapi.ext import FlaskSX
-from .util import MockGet
+from .util import MockGet, MockMany
 
 
 class TestConfig(object):
@@ -37,22 +37,18 @@ class FlaskTests(unittest.TestCase):
         with self.assertRaises(AttributeError):
             self.sxapi.hello()
 
-        with MockGet() as patched_session:
+        with MockMany() as mocks:
             self.sxapi.user
-            call = patched_session.call_args_list
-            self.assertEqual(call[0][0][0], "/user")
-
-        with MockGet() as patched_session:
             self.sxapi.get_animal_object("abcd").data
-            call = patched_session.call_args_list
-            self.assertEqual(call[0][0][0], "/animal/by_id")
-            self.assertEqual(call[0][1]["params"]["animal_id"], "abcd")
-
-        with MockGet() as patched_session:
             self.sxapi.get_organisation_object("abcd").data
-            call = patched_session.call_args_list
-            self.assertEqual(call[0][0][0], "/organisation/by_id")
-            self.assertEqual(call[0][1]["params"]["organisation_id"], "abcd")
+            call = mocks["get"].call_args_list
+            self.assertEqual(call[0][0][0], "/user")
+            self.assertEqual(call[1][0][0], "/animal/by_id")
+            self.assertEqual(call[1][1]["params"]["animal_id"], "abcd")
+            self.assertEqual(call[2][0][0], "/organisation/by_id")
+            self.assertEqual(call[2][1]["params"]["organisation_id"], "abcd")
+            self.assertEqual(mocks["post"].call_args_list, [])
+            self.assertEqual(mocks["put"].call_args_list, [])
 
     def test_lowlevel_calls(self):
         with MockGet() as patched_session:
@@ -1,11 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import io
+import json
 import unittest
+import threading
 import time
 
-from .util import MockGet, MockPost, MockPut
-from sxapi import LowLevelAPI
+import mock
+import requests
+from requests.exceptions import HTTPError
+
+from .util import LocalServer, MockGet, MockPost, MockPut
+from sxapi import LowLevelAPI, low
+from sxapi.helper import np
 
 
 class LowApiTests(unittest.TestCase):
@@ -271,3 +279,380 @@ class LowApiTests(unittest.TestCase):
             sxapi.query_organisations()
             call = patched_session.call_args_list
             self.assertEqual(call[0][0][0], "/organisation/list")
+
+    def test_pagination(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        pages = [
+            {"data": list(range(100)), "pagination": {"next_offset": 100}},
+            {"data": list(range(100, 150)), "pagination": {"next_offset": 150}},
+        ]
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=pages) as patched_session:
+            res = sxapi.query_organisations()
+            self.assertEqual(res, list(range(150)))
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 2)
+            self.assertEqual(call[0][0][0], "/organisation/list")
+            self.assertEqual(call[0][1]["version"], "v1")
+            self.assertNotIn("partner_id", call[0][1]["params"])
+
+    def test_pagination_end(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        pages = [
+            {"data": list(range(100)), "pagination": {"next_offset": 100, "has_more": True}},
+            {"data": list(range(100, 200)), "pagination": {"next_offset": 200, "has_more": False}},
+        ]
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=pages) as patched_session:
+            self.assertEqual(sxapi.query_users(), list(range(200)))
+            self.assertEqual(len(patched_session.call_args_list), 2)
+        pages = [{"data": list(range(100)), "pagination": {}}]
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=pages) as patched_session:
+            self.assertEqual(list(sxapi.query_users_iter()), list(range(100)))
+            self.assertEqual(len(patched_session.call_args_list), 1)
+
+    def test_paginate_iter(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        prefetched = threading.Event()
+
+        def page(path, params=None, version=None):
+            if params["offset"]:
+                prefetched.set()
+                return {"data": list(range(100, 150)), "pagination": {"next_offset": 150}}
+            return {"data": list(range(100)), "pagination": {"next_offset": 100}}
+
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=page) as patched_session:
+            users = sxapi.query_users_iter("foo")
+            self.assertEqual(next(users), 0)
+            # the second page is prefetched while the first is consumed
+            self.assertTrue(prefetched.wait(5))
+            self.assertEqual(list(users), list(range(1, 150)))
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 2)
+            self.assertEqual(call[0][0][0], "/user/list")
+            self.assertEqual(call[1][1]["params"]["offset"], 100)
+
+    def test_async_pagination(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        sxapi.privatelow._async = True
+
+        def page(path, params=None, version=None):
+            offset = params["offset"]
+            return {"data": list(range(offset, min(offset + 100, 250))),
+                    "pagination": {"next_offset": offset + 100, "total": 250}}
+
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=page) as patched_session:
+            res = sxapi.query_organisations()
+            self.assertEqual(res, list(range(250)))
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 3)
+            self.assertEqual(sorted(c[1]["params"]["offset"] for c in call[1:]), [100, 200])
+            self.assertTrue(all(c[1]["version"] == "v1" for c in call))
+
+    def test_async_sensordata(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY, asynchronous=True)
+        day = 24 * 60 * 60
+
+        def chunk(path, params=None, version=None):
+            return {"data": [[params["from_date"], 1.0], [params["to_date"], 2.0]]}
+
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=chunk) as patched_session:
+            res = sxapi.get_device_sensordata("1234567890", "temp", 0, 250 * day)
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 3)
+            self.assertTrue(all(c[0][0] == "/data/query" for c in call))
+            self.assertEqual([x[0] for x in res], [0, 100 * day - 1, 100 * day, 200 * day - 1, 200 * day, 250 * day])
+
+    def test_async_get_errors(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+
+        def fail_b(path, params=None, version=None):
+            if path == "/b":
+                raise HTTPError("500 Server Error")
+            return {"path": path}
+
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=fail_b):
+            with self.assertRaises(HTTPError):
+                sxapi.publiclow.async_get(["/a", "/b", "/c"])
+            res = sxapi.publiclow.async_get(["/a", "/b", "/c"], raise_on_error=False)
+            self.assertEqual(res, [{"path": "/a"}, None, {"path": "/c"}])
+
+    @unittest.skipIf(low.aiohttp is None, "aiohttp not installed")
+    def test_async_get_aiohttp(self):
+        with LocalServer({"/api/v0/err500": [(500, {"message": "boom"})]}) as server:
+            api = low.LowLevelInternAPI(server.url, api_key=self.API_KEY, async_backend="aiohttp")
+            with api:
+                res = api.async_get(["/a", ("/b", {"x": 1}), {"path": "/c", "version": "v1", "cache": True}])
+                self.assertEqual([r["path"] for r in res], ["/api/v0/a", "/api/v0/b", "/api/v1/c"])
+                self.assertEqual(res[1]["query"], {"x": ["1"]})
+                self.assertEqual(res[0]["auth"], "Bearer abcd")
+                session = api._aiohttp_session
+                self.assertEqual(api.async_get([{"path": "/c", "version": "v1", "cache": True}]), res[2:])
+                self.assertIs(api._aiohttp_session, session)
+                self.assertEqual(len(server.calls), 3)
+                with self.assertRaises(TypeError):
+                    api.async_get([{"path": "/a", "stream": True}])
+                with self.assertRaises(HTTPError):
+                    api.async_get(["/a", "/err500"])
+                self.assertEqual(api.async_get(["/err500", "/a"], raise_on_error=False)[0], None)
+            self.assertIsNone(api._aiohttp_session)
+            self.assertEqual(api.async_get(["/a"])[0]["path"], "/api/v0/a")
+            api.close()
+
+    def test_get_uploads_many(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+
+        def uploads(path, params=None, version=None):
+            time.sleep(0.01 * int(params["device_id"]))
+            return [params["device_id"]]
+
+        with mock.patch("sxapi.low.BaseAPI.get", side_effect=uploads) as patched_session:
+            res = sxapi.getUploadsMany(["3", "1", "2"], 1000, 2000)
+            self.assertEqual(res, [["3"], ["1"], ["2"]])
+            call = patched_session.call_args_list
+            self.assertTrue(all(c[0][0] == "/anthilluploadbulk" for c in call))
+            self.assertTrue(all(c[1]["params"]["from_date"] == 1000 for c in call))
+            executor = sxapi.privatelow._map_executor
+            sxapi.getUploadsMany(["1"], 1000, 2000)
+            self.assertIs(sxapi.privatelow._map_executor, executor)
+        sxapi.privatelow.close()
+        self.assertIsNone(sxapi.privatelow._map_executor)
+
+    def test_group_sensordata_validation(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        with mock.patch("sxapi.low.BaseAPI.put") as patched_session:
+            with self.assertRaises(ValueError):
+                sxapi.insertGroupSensorDataBulk(iter([{"metric": "temp", "data": [[1, 1.0], ["x", 2.0]]}]))
+            self.assertEqual(len(patched_session.call_args_list), 0)
+            sxapi.insertGroupSensorDataBulk(iter([{"metric": "temp", "data": [[1, 1.0], [2, 2.0]]}]))
+            call = patched_session.call_args_list
+            self.assertEqual(call[0][0][0], "/groupsensordatabulk")
+            self.assertEqual(len(call[0][1]["json"]["sensordata"]), 1)
+
+    @unittest.skipIf(low.orjson is None or np is None, "orjson or numpy not installed")
+    def test_encode_numpy_json(self):
+        kwargs = {"json": {"sensordata": [{"metric": "temp", "data": np.array([[1, 2.5], [2, 3.0]])}]}}
+        low.BaseAPI._encode_json(kwargs)
+        self.assertNotIn("json", kwargs)
+        self.assertEqual(kwargs["data"], b'{"sensordata":[{"metric":"temp","data":[[1.0,2.5],[2.0,3.0]]}]}')
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+        # non contiguous arrays go through tolist()
+        kwargs = {"json": {"data": np.array([[1, 2.5, 0], [2, 3.0, 0]])[:, :2]}}
+        low.BaseAPI._encode_json(kwargs)
+        self.assertEqual(kwargs["data"], b'{"data":[[1.0,2.5],[2.0,3.0]]}')
+
+    def test_decode_json(self):
+        response = requests.Response()
+        response.encoding = "utf-8"
+        response._content = b'{"v": NaN, "n": 123456789012345678901234567890}'
+        res = low.BaseAPI._decode_json(response)
+        self.assertNotEqual(res["v"], res["v"])
+        self.assertEqual(res["n"], 123456789012345678901234567890)
+        response._content = b'{"n": -9223372036854775809}'
+        self.assertEqual(low.BaseAPI._decode_json(response), {"n": -9223372036854775809})
+        response._content = b'{"v": [1.5, 2]}'
+        self.assertEqual(low.BaseAPI._decode_json(response), {"v": [1.5, 2]})
+
+    def test_error_message(self):
+        response = requests.Response()
+        response.encoding = "utf-8"
+        for ctype in ("application/json", "application/problem+json", None):
+            response.headers = {"Content-Type": ctype} if ctype else {}
+            response._content = b'{"message": "bad thing"}'
+            self.assertEqual(low.BaseAPI._error_message(response), "bad thing")
+        for content in (b"", b"oops", b"[1]"):
+            response._content = content
+            self.assertEqual(low.BaseAPI._error_message(response), "unknown")
+
+    def test_cached_get(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        with mock.patch("requests.Session.request") as patched_session, \
+                mock.patch("sxapi.low.BaseAPI._handle_response", return_value=["0700003445"]):
+            self.assertEqual(sxapi.searchDevices("07000"), ["0700003445"])
+            sxapi.searchDevices("07000")
+            self.assertEqual(len(patched_session.call_args_list), 1)
+            sxapi.searchDevices("07001")
+            self.assertEqual(len(patched_session.call_args_list), 2)
+            sxapi.move_device("0700003445", "my_org_id")
+            sxapi.searchDevices("07000")
+            self.assertEqual(len(patched_session.call_args_list), 4)
+            sxapi.privatelow.invalidate_cache()
+            sxapi.searchDevices("07000")
+            self.assertEqual(len(patched_session.call_args_list), 5)
+            sxapi.searchDevices("07000").append("0700000000")
+            self.assertEqual(sxapi.searchDevices("07000"), ["0700003445"])
+            self.assertEqual(len(patched_session.call_args_list), 5)
+
+    def test_get_stream(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        body = b'[{"metric": "temp", "data": [[1, 38.5]]}, {"metric": "act", "data": []}]'
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(body)
+        with mock.patch("requests.Session.request", return_value=response) as patched_session:
+            res = sxapi.getGroupSensorDataBulkIter("my_group_id", ["temp", "act"], 1000, 2000)
+            self.assertEqual(patched_session.call_args_list, [])
+            if low.ijson is not None:
+                self.assertEqual([s["metric"] for s in res], ["temp", "act"])
+                self.assertTrue(patched_session.call_args_list[0][1]["stream"])
+        with mock.patch("sxapi.low.ijson", None), \
+                mock.patch("sxapi.low.BaseAPI.get", return_value=json.loads(body)) as patched_session:
+            res = sxapi.getGroupSensorDataBulkIter("my_group_id", ["temp", "act"], 1000, 2000)
+            self.assertEqual([s["metric"] for s in res], ["temp", "act"])
+            self.assertEqual(patched_session.call_args_list[0][0][0], "/groupsensordatabulk")
+
+    @unittest.skipIf(low.httpx is None, "httpx not installed")
+    def test_http2(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY, http2=True)
+        self.assertEqual(sxapi.privatelow.http_backend, "httpx")
+        session = sxapi.privatelow.session
+        self.assertIsInstance(session, low._HttpxSession)
+        self.assertEqual(session.headers["Authorization"], "Bearer abcd")
+        sxapi.privatelow.close()
+
+    def test_sensordata_validation(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        bad = {"device_id": "1234567890", "metric": "temp", "data": [[1, 1.0], [2, None]]}
+        with MockPut() as patched_session:
+            with self.assertRaises(ValueError):
+                sxapi.insertSensorDataBulk(x for x in [bad])
+            self.assertEqual(len(patched_session.call_args_list), 0)
+        with MockPost() as patched_session:
+            with self.assertRaises(ValueError) as error:
+                sxapi.updateSensorDataBulk(x for x in [bad])
+            self.assertEqual(str(error.exception), "Invalid VALUE Point: [2, None] of metric temp")
+            self.assertEqual(len(patched_session.call_args_list), 0)
+        with MockPut() as patched_session:
+            for data in ([[1, 1.0], [2, float("nan")]], [[float("inf"), 1.0]]):
+                with self.assertRaises(ValueError):
+                    sxapi.insertSensorDataBulk([dict(bad, data=data)])
+                if np is not None:
+                    with self.assertRaises(ValueError):
+                        sxapi.insertSensorDataBulk([dict(bad, data=np.array(data))])
+            self.assertEqual(len(patched_session.call_args_list), 0)
+        with MockGet() as patched_session:
+            metrics = ["temp", "act"]
+            sxapi.getGroupSensorDataBulk("my_group_id", metrics, 1000, 2000)
+            self.assertIs(patched_session.call_args_list[0][1]["params"]["metrics"], metrics)
+
+    def test_device_uploads_iter(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        day = 24 * 60 * 60
+        with MockGet() as patched_session:
+            windows = sxapi.get_device_uploads_iter(0, 2 * day + day // 2, "1234567890")
+            f, t, _ = next(windows)
+            self.assertEqual((f, t), (0, day - 1))
+            self.assertEqual(len(patched_session.call_args_list), 1)
+            self.assertEqual([w[:2] for w in windows], [(day, 2 * day - 1), (2 * day, 2 * day + day // 2)])
+            call = patched_session.call_args_list
+            self.assertEqual(len(call), 3)
+            self.assertEqual(call[2][0][0], "/anthilluploadbulk")
+            self.assertEqual(call[2][1]["params"]["from_date"], 2 * day)
+
+    def test_default_version(self):
+        class InternAPIv1(low.LowLevelInternAPI):
+            default_version = "v1"
+
+        api = InternAPIv1(self.INTERN_ENDPOINT, api_key=self.API_KEY)
+        self.assertEqual(api.to_url("/devicesearch"), "http://0.0.0.0:8787/internapi/v1/devicesearch")
+        self.assertEqual(api.to_url("/devicesearch", "v2"), "http://0.0.0.0:8787/internapi/v2/devicesearch")
+        api = low.BaseAPI(self.INTERN_ENDPOINT, default_version="v2")
+        self.assertEqual(api.to_url("/devicesearch"), "http://0.0.0.0:8787/internapi/v2/devicesearch")
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        self.assertEqual(sxapi.privatelow.to_url("/devicesearch"), "http://0.0.0.0:8787/internapi/v0/devicesearch")
+        api = low.LowLevelInternAPI(self.INTERN_ENDPOINT, api_key=self.API_KEY, default_version="v1")
+        self.assertEqual(api.to_url("/devicesearch"), "http://0.0.0.0:8787/internapi/v1/devicesearch")
+
+    def test_client_options(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY, max_workers=4, track_requests=False, default_version="v2")
+        for api in (sxapi.publiclow, sxapi.privatelow):
+            self.assertEqual(api.max_workers, 4)
+            self.assertFalse(api._track)
+            self.assertEqual(api.default_version, "v2")
+        api = low.LowLevelInternAPIV2(self.INTERN_ENDPOINT, api_key=self.API_KEY, max_workers=2)
+        self.assertEqual(api.max_workers, 2)
+        with self.assertRaises(TypeError):
+            low.LowLevelPublicAPI(api_key=self.API_KEY, foo=1)
+
+    def test_retries(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY, retries=5, backoff=0.5)
+        retry = sxapi.privatelow.session.get_adapter(self.INTERN_ENDPOINT).max_retries
+        self.assertEqual(retry.total, 5)
+        self.assertEqual(retry.backoff_factor, 0.5)
+        self.assertNotIn("PUT", retry.allowed_methods)
+        self.assertEqual(sxapi.publiclow.session.get_adapter(self.PUBLIC_ENDPOINT).max_retries.total, 5)
+
+    def test_status_retries(self):
+        backends = [{}]
+        if low.httpx is not None:
+            backends.append({"http2": True})
+        if low.aiohttp is not None:
+            backends.append({"async_backend": "aiohttp"})
+        for backend in backends:
+            flaky = [(503, {}), (503, {}), (200, {"ok": True})]
+            with LocalServer({"/api/v0/flaky": list(flaky), "/api/v0/down": [(503, {})]}) as server:
+                with low.LowLevelInternAPI(server.url, api_key=self.API_KEY, backoff=0, **backend) as api:
+                    self.assertEqual(api.async_get(["/flaky"])[0], {"ok": True})
+                    self.assertEqual(len(server.calls), 3)
+                    with self.assertRaises(HTTPError):
+                        api.async_get(["/down"])
+                    self.assertEqual(len(server.calls), 7)
+                    server.routes["/api/v0/flaky"] = list(flaky)
+                with low.LowLevelInternAPI(server.url, api_key=self.API_KEY, retries=1, **backend) as api:
+                    with self.assertRaises(HTTPError):
+                        api.async_get(["/flaky"])
+                    self.assertEqual(len(server.calls), 9)
+
+    def test_close(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        with sxapi.privatelow as client:
+            session = client.session
+            self.assertEqual(session.headers["Authorization"], "Bearer abcd")
+        self.assertIsNone(sxapi.privatelow._session)
+        self.assertIsNot(sxapi.privatelow.session, session)
+        self.assertEqual(sxapi.privatelow.session.headers["Authorization"], "Bearer abcd")
+
+    def test_memoized_reads(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        with mock.patch("sxapi.low.BaseAPI.get", return_value={"timezone": "Europe/Vienna"}) as patched_session:
+            sxapi.get_organisation_by_id("my_org_id")
+            sxapi.get_organisation_by_id("my_org_id")["timezone"] = "UTC"
+            self.assertEqual(sxapi.publiclow.get_timezone_for_organisation_id("my_org_id"), "Europe/Vienna")
+            self.assertEqual(len(patched_session.call_args_list), 1)
+            sxapi.publiclow.invalidate_cache()
+            sxapi.get_organisation_by_id("my_org_id")
+            self.assertEqual(len(patched_session.call_args_list), 2)
+            sxapi.publiclow.invalidate_cache()
+            self.assertEqual(sxapi.publiclow.get_timezone_for_organisation_id("my_org_id"), "Europe/Vienna")
+            self.assertEqual(len(patched_session.call_args_list), 2)
+
+    def test_memoized_reads_after_write(self):
+        sxapi = LowLevelAPI(private_endpoint=self.INTERN_ENDPOINT, public_endpoint=self.PUBLIC_ENDPOINT,
+                            api_key=self.API_KEY)
+        with mock.patch("requests.Session.request") as patched_session, \
+                mock.patch("sxapi.low.BaseAPI._handle_response", return_value={"_id": "abcd"}):
+            sxapi.get_animal_by_id("abcd")
+            sxapi.get_animal_by_id("abcd")
+            self.assertEqual(len(patched_session.call_args_list), 1)
+            sxapi.publiclow.insert_animal_annotation("abcd", 1000, 2000)
+            sxapi.get_animal_by_id("abcd")
+            self.assertEqual(len(patched_session.call_args_list), 3)
+            sxapi.getSensorDataRange("1234567890", "temp")
+            sxapi.getSensorDataRange("1234567890", "temp")
+            self.assertEqual(len(patched_session.call_args_list), 5)
@@ -1,60 +1,79 @@
 
+import contextlib
+import json
+import threading
 import mock
-from collections import namedtuple
 
-Result = namedtuple("Result", ["status_code"])
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
 
-def side_effect(*args, **kwargs):
-    return Result(200)
+def MockVerb(verb):
+    """Patch BaseAPI.<verb>, entering the patch returns the mock."""
+    return mock.patch("sxapi.low.BaseAPI.{}".format(verb))
 
 
-class MockGet():
-    def __init__(self):
-        self.call_counter = 0
-        self.calls = []
-        self.get = mock.patch('sxapi.low.BaseAPI.get')
-        self.get.side_effect = side_effect
+def MockGet():
+    return MockVerb("get")
 
-    def __enter__(self):
-        return self.get.__enter__()
 
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.get.__exit__()
+def MockPost():
+    return MockVerb("post")
 
-    def calls(self):
-        return self.get.call_args_list
 
+def MockPut():
+    return MockVerb("put")
 
-class MockPost():
-    def __init__(self):
-        self.call_counter = 0
-        self.calls = []
-        self.post = mock.patch('sxapi.low.BaseAPI.post')
-        self.post.side_effect = side_effect
 
-    def __enter__(self):
-        return self.post.__enter__()
+@contextlib.contextmanager
+def MockMany(verbs=("get", "post", "put")):
+    """Patch several verbs at once, yields a dict of the mocks by verb."""
+    with contextlib.ExitStack() as stack:
+        yield {verb: stack.enter_context(MockVerb(verb)) for verb in verbs}
 
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.post.__exit__()
 
-    def calls(self):
-        return self.post.call_args_list
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
 
+    def _handle(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else None
+        call = {"method": self.command, "path": url.path, "query": parse_qs(url.query),
+                "auth": self.headers.get("Authorization"), "body": body}
+        self.server.calls.append(call)
+        responses = self.server.routes.get(url.path)
+        if responses:
+            status, res = responses.pop(0) if len(responses) > 1 else responses[0]
+        else:
+            status, res = 200, call
+        content = json.dumps(res).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
 
-class MockPut():
-    def __init__(self):
-        self.call_counter = 0
-        self.calls = []
-        self.put = mock.patch('sxapi.low.BaseAPI.put')
-        self.put.side_effect = side_effect
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
 
-    def __enter__(self):
-        return self.put.__enter__()
 
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.put.__exit__()
+@contextlib.contextmanager
+def LocalServer(routes=None):
+    """Serve HTTP on localhost in a thread, yields the server.
 
-    def calls(self):
-        return self.put.call_args_list
+    server.url is an api base url on it. routes maps paths to lists of
+    (status, json body) answered in turn, the last one repeats; other paths
+    echo the request. server.calls records the requests as dicts.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.routes = dict(routes or {})
+    server.calls = []
+    server.url = "http://127.0.0.1:{}/api/v0".format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()